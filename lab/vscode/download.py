@@ -2,7 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
-#     "httpx",
+#     "aiohttp",
 #     "rich",
 #     "PySquashfsImage>=0.9.0",
 #     "py7zr>=0.22.0",
@@ -17,23 +17,35 @@ Downloads latest versions of VSCode, VSCodium, Cursor, and Windsurf for all plat
 Uses incremental downloads with version tracking via touch files.
 """
 
+import argparse
 import asyncio
+import contextlib
 import hashlib
 import json
+import mmap
+import multiprocessing
+import os
+import random
 import re
 import shutil
 import struct
 import subprocess
 import sys
 import tarfile
+import threading
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
-import httpx
+import aiohttp
 import libarchive
 import py7zr
+import zstandard
 from PySquashfsImage import SquashFsImage
 from PySquashfsImage.extract import extract_dir as extract_squashfs_dir
 from rich.console import Console
@@ -48,13 +60,98 @@ BASE_DIR = Path(__file__).parent
 TOOLS_DIR = BASE_DIR / ".tools"
 TOOLS_DIR.mkdir(exist_ok=True)
 
+# Cache directory for version manifests (revalidated with ETag/Last-Modified)
+CACHE_DIR = BASE_DIR / ".cache"
 
+# How long a product's recorded latest version is trusted before asking upstream again
+LATEST_CHECK_TTL = 6 * 60 * 60
+
+# Number of worker threads for blocking work such as archive extraction. They have their own
+# executor: the default one also resolves host names for new connections
+EXTRACT_WORKERS = 8
+EXTRACT_EXECUTOR = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract")
+
+# Number of worker processes inflating ZIP archives; inflating is CPU-bound and holds the GIL
+ZIP_WORKERS = min(os.cpu_count() or 1, EXTRACT_WORKERS)
+
+# Maximum number of archive transfers running at once across all products
+MAX_CONCURRENT_DOWNLOADS = 4
+DOWNLOAD_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+# Threads that write, hash and feed downloaded data. They are separate from EXTRACT_EXECUTOR,
+# so busy extractions never stall a transfer
+DISK_IO_WORKERS = 2 * MAX_CONCURRENT_DOWNLOADS
+DISK_IO_EXECUTOR = ThreadPoolExecutor(max_workers=DISK_IO_WORKERS, thread_name_prefix="download-io")
+
+# HTTP timeouts in seconds for establishing a connection and for each socket read
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 30
+
+# Attempts per HTTP request, and the backoff between them in seconds: doubling from the base
+# up to the cap, plus up to one base delay of random jitter so parallel retries spread out
+HTTP_RETRY_ATTEMPTS = 5
+HTTP_RETRY_BASE_DELAY = 0.5
+HTTP_RETRY_MAX_DELAY = 10
+
+# Response statuses worth retrying: rate limiting and transient server errors
+HTTP_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Size of the blocks a download is written to disk in. aiohttp returns whatever has arrived,
+# usually much less, so reads are joined up to this size by read_chunks
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Number of downloaded chunks that may wait to be written to disk
+WRITE_QUEUE_SIZE = 8
+
+# Files larger than this are fetched as parallel byte ranges when the server allows it
+RANGED_DOWNLOAD_THRESHOLD = 16 * 1024 * 1024
+
+# Size of each byte range requested by a ranged download
+RANGED_PIECE_SIZE = 8 * 1024 * 1024
+
+# Number of parallel connections per ranged download
+RANGED_DOWNLOAD_CONNECTIONS = 8
+
+# Connection pool size: every ranged transfer at full width plus room for metadata requests
+HTTP_MAX_CONNECTIONS = MAX_CONCURRENT_DOWNLOADS * RANGED_DOWNLOAD_CONNECTIONS + 16
+
+# Minimum interval between progress bar updates, in seconds (~20 Hz)
+PROGRESS_INTERVAL = 0.05
+
+# Buffer size used when reading tar streams
+TAR_BUFSIZE = 1024 * 1024
+
+# Buffer size used when copying ZIP members to disk
+ZIP_COPY_CHUNK = 1024 * 1024
+
+# Window size used when copying the SquashFS part out of a mapped AppImage
+SQUASHFS_COPY_CHUNK = 1024 * 1024
+
+# Errors an extractor may hit on a broken or unsupported archive; anything else is a bug.
+# ValueError covers mmap of an empty file and malformed headers.
+EXTRACTION_ERRORS = (
+    OSError,
+    ValueError,
+    zipfile.BadZipFile,
+    tarfile.TarError,
+    libarchive.ArchiveError,
+    subprocess.SubprocessError,
+)
+
+# Windsurf download URL on the releases page, capturing commit and version
+# Pattern: https://windsurf-stable.codeiumdata.com/{platform}/stable/{commit}/{filename}
+WINDSURF_DOWNLOAD_PREFIX = "https://windsurf-stable.codeiumdata.com/"
+WINDSURF_DOWNLOAD_RE = re.compile(
+    r'https://windsurf-stable\.codeiumdata\.com/[^/]+/stable/([a-f0-9]+)/[^-]+-[^-]+-[^-]+-(\d+\.\d+\.\d+)\.'
+)
+
+
+@dataclass(slots=True, frozen=True)
 class Platform:
     """Platform configuration for downloads"""
-    def __init__(self, os_name: str, arch: str, prefer_arm: bool = True):
-        self.os_name = os_name
-        self.arch = arch
-        self.prefer_arm = prefer_arm
+    os_name: str
+    arch: str
+    prefer_arm: bool = True
 
     def __repr__(self):
         return f"Platform({self.os_name}, {self.arch})"
@@ -70,32 +167,68 @@ PLATFORMS = [
     Platform("darwin", "x64"),
 ]
 
+# Products handled by the downloaders below, whose fallback file names are precomputed
+PRODUCTS = ("vscode", "vscodium", "cursor", "windsurf")
+
+# Archive extension per OS, for download URLs that do not end in a file name
+FALLBACK_EXTENSIONS = {
+    "windows": ".zip",
+    "linux": ".tar.gz",
+    "darwin": ".zip",
+}
+
+
+def fallback_filename(product: str, platform: Platform) -> str:
+    """File name for a download URL ending in a channel such as ".../stable" rather than a file name"""
+    return f"{product}-{platform.os_name}-{platform.arch}{FALLBACK_EXTENSIONS.get(platform.os_name, '')}"
+
+
+# fallback_filename per (product, os, arch); other products are named on demand
+FILENAME_FALLBACK = {
+    (product, platform.os_name, platform.arch): fallback_filename(product, platform)
+    for product in PRODUCTS
+    for platform in PLATFORMS
+}
+
 
 class VersionInfo:
     """Tracks version information for incremental downloads"""
+    __slots__ = ("product", "version", "os_name", "arch", "folder_name", "version_file",
+                 "_download_path", "_version_file_str", "_metadata")
+
     def __init__(self, product: str, version: str, os_name: str, arch: str):
         self.product = product
         self.version = version
         self.os_name = os_name
         self.arch = arch
         self.folder_name = f"{product}-{version}-{os_name}-{arch}"
-        self.version_file = BASE_DIR / product / self.folder_name / ".version"
+        # Paths are built once; they are needed several times per platform
+        self._download_path = BASE_DIR / product / self.folder_name
+        self.version_file = self._download_path / ".version"
+        self._version_file_str = str(self.version_file)
+        self._metadata: Optional[dict] = None
+
+    def _load_metadata(self) -> dict:
+        """Parse the .version file once; a missing or broken file yields empty metadata"""
+        if self._metadata is None:
+            try:
+                with open(self._version_file_str, "rb") as f:
+                    self._metadata = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._metadata = {}
+        return self._metadata
 
     def is_downloaded(self) -> bool:
         """Check if this version is already downloaded and unpacked"""
-        if not self.version_file.exists():
+        # A plain stat answers for versions never downloaded, without opening anything
+        if self._metadata is None and not os.path.exists(self._version_file_str):
             return False
-
         # Check if unpacked flag is set
-        try:
-            metadata = json.loads(self.version_file.read_text())
-            return metadata.get("unpacked", False)
-        except:
-            return False
+        return self._load_metadata().get("unpacked", False)
 
-    def mark_downloaded(self, download_url: str, file_size: int, unpacked: bool = False):
+    def mark_downloaded(self, download_url: str, file_size: int, unpacked: bool = False, sha256: Optional[str] = None):
         """Mark this version as downloaded and optionally unpacked"""
-        self.version_file.parent.mkdir(parents=True, exist_ok=True)
+        self._download_path.mkdir(parents=True, exist_ok=True)
         metadata = {
             "product": self.product,
             "version": self.version,
@@ -103,67 +236,593 @@ class VersionInfo:
             "arch": self.arch,
             "download_url": download_url,
             "file_size": file_size,
+            "sha256": sha256,
             "unpacked": unpacked,
         }
         self.version_file.write_text(json.dumps(metadata, indent=2))
+        self._metadata = metadata
 
     def get_download_path(self) -> Path:
         """Get the directory for this download"""
-        return self.version_file.parent
+        return self._download_path
+
+
+class LatestCheck:
+    """Records the latest version seen for a product, so warm runs can skip the remote checks"""
+    __slots__ = ("product", "latest_file")
+
+    def __init__(self, product: str):
+        self.product = product
+        self.latest_file = BASE_DIR / product / ".latest"
+
+    def load_fresh(self) -> Optional[dict]:
+        """Return the recorded check if it is younger than LATEST_CHECK_TTL, otherwise None"""
+        try:
+            data = json.loads(self.latest_file.read_bytes())
+        except (OSError, json.JSONDecodeError):
+            return None
+        # A record not written by save() counts as stale rather than aborting the run
+        if not isinstance(data, dict) or not isinstance(data.get("version"), str):
+            return None
+        if not isinstance(data.get("unavailable", []), list):
+            return None
+        fetched_at = data.get("fetched_at", 0)
+        if not isinstance(fetched_at, (int, float)) or time.time() - fetched_at > LATEST_CHECK_TTL:
+            return None
+        return data
+
+    def is_up_to_date(self, platforms: List[Platform]) -> bool:
+        """True if the recorded version is fresh and every platform is downloaded or known to be unavailable"""
+        data = self.load_fresh()
+        if not data:
+            return False
+        unavailable = set(data.get("unavailable", []))
+        return all(
+            f"{platform.os_name}-{platform.arch}" in unavailable
+            or VersionInfo(self.product, data["version"], platform.os_name, platform.arch).is_downloaded()
+            for platform in platforms
+        )
+
+    def save(self, version: str, unavailable: List[str]):
+        """Atomically record the version that was just fetched"""
+        self.latest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.latest_file.with_name(".latest.tmp")
+        tmp_file.write_text(json.dumps({
+            "version": version,
+            "fetched_at": time.time(),
+            "unavailable": sorted(unavailable),
+        }, indent=2))
+        tmp_file.replace(self.latest_file)
+
+
+@dataclass(slots=True)
+class DownloadResult:
+    """A finished download: where it is, how many bytes arrived and their SHA-256"""
+    path: Path
+    size: int
+    sha256: str
+
+
+class TransientHTTPStatus(Exception):
+    """A response status that may succeed when the request is repeated"""
+
+
+def check_transient_status(response: aiohttp.ClientResponse):
+    """Raise TransientHTTPStatus for a rate-limited or transient server error response"""
+    if response.status in HTTP_RETRY_STATUSES:
+        raise TransientHTTPStatus(f"HTTP {response.status} from {response.url}")
+
+
+async def with_retries(operation: Callable[[], Awaitable[Any]], what: str):
+    """
+    Run an HTTP operation, repeating it on connection errors, timeouts and transient statuses
+    with exponential backoff and jitter. Other errors, and the last failure, are raised.
+    """
+    for attempt in range(HTTP_RETRY_ATTEMPTS):
+        try:
+            return await operation()
+        except (aiohttp.ClientError, asyncio.TimeoutError, TransientHTTPStatus) as e:
+            if attempt == HTTP_RETRY_ATTEMPTS - 1:
+                raise
+            delay = min(HTTP_RETRY_MAX_DELAY, HTTP_RETRY_BASE_DELAY * 2 ** attempt)
+            delay += random.uniform(0, HTTP_RETRY_BASE_DELAY)
+            console.print(f"    [dim]{what} failed ({str(e) or type(e).__name__}), retrying in {delay:.1f}s[/dim]")
+            await asyncio.sleep(delay)
+
+
+async def run_disk_io(func: Callable[..., Any], *args):
+    """Run a blocking write or hash step of a download on DISK_IO_EXECUTOR"""
+    return await asyncio.get_running_loop().run_in_executor(DISK_IO_EXECUTOR, func, *args)
+
+
+async def read_chunks(content: aiohttp.StreamReader):
+    """Yield a response body in blocks of at least DOWNLOAD_CHUNK_SIZE bytes; only the last may be shorter"""
+    buffer = bytearray()
+    async for data in content.iter_any():
+        buffer += data
+        if len(buffer) >= DOWNLOAD_CHUNK_SIZE:
+            yield buffer
+            buffer = bytearray()
+    if buffer:
+        yield buffer
+
+
+def range_validator(headers) -> Optional[str]:
+    """The If-Range value identifying a response's content: its strong ETag, else its Last-Modified date"""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def part_state_path(part_path: Path) -> Path:
+    """Sidecar file describing a .part file"""
+    return part_path.with_name(part_path.name + ".json")
+
+
+def load_part_state(part_path: Path) -> Optional[dict]:
+    """
+    Read the sidecar of a .part file: the If-Range validator of the content it holds and,
+    for a ranged download, the file size and the pieces already written.
+    Returns None if there is no partial download to trust.
+    """
+    if not part_path.exists():
+        return None
+    try:
+        return json.loads(part_state_path(part_path).read_bytes())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_part_state(part_path: Path, state: dict):
+    """Atomically write the sidecar of a .part file"""
+    state_path = part_state_path(part_path)
+    tmp_path = state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state))
+    tmp_path.replace(state_path)
+
+
+def discard_part(part_path: Path):
+    """Remove a .part file together with its sidecar"""
+    part_path.unlink(missing_ok=True)
+    part_state_path(part_path).unlink(missing_ok=True)
+
+
+class RangesNotSupported(Exception):
+    """Raised when a server answers a range request with the whole file"""
+
+
+class ProgressReporter:
+    """Batches progress bar advances into at most one update per PROGRESS_INTERVAL"""
+
+    def __init__(self, progress: Progress, task_id):
+        self.progress = progress
+        self.task_id = task_id
+        self.pending = 0
+        self.last_update = time.monotonic()
+
+    def advance(self, amount: int):
+        self.pending += amount
+        now = time.monotonic()
+        if now - self.last_update >= PROGRESS_INTERVAL:
+            self.flush()
+            self.last_update = now
+
+    def flush(self):
+        if self.pending:
+            self.progress.update(self.task_id, advance=self.pending)
+            self.pending = 0
+
+
+class StreamExtractor:
+    """
+    Extracts a .tar.gz archive from chunks fed to it while the archive is still downloading.
+    The chunks go through a pipe to a tar reader in its own thread.
+    """
+
+    def __init__(self, extract_dir: Path):
+        self.extract_dir = extract_dir
+        self.error: Optional[BaseException] = None
+        read_fd, self._write_fd = os.pipe()
+        self._reader = open(read_fd, 'rb', buffering=TAR_BUFSIZE)
+        # A dedicated thread: it blocks on the pipe for the whole download
+        self._thread = threading.Thread(target=self._extract, daemon=True)
+        self._thread.start()
+
+    def _extract(self):
+        try:
+            with tarfile.open(fileobj=self._reader, mode='r|gz', bufsize=TAR_BUFSIZE) as tar_ref:
+                tar_ref.extractall(self.extract_dir, filter='data')
+            # Drain the padding after the end-of-archive marker so the writer never blocks
+            while self._reader.read(TAR_BUFSIZE):
+                pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._reader.close()
+
+    def feed(self, chunk: bytes):
+        """Pass the next chunk of the archive; blocks while the extractor catches up"""
+        if self._write_fd is None:
+            return
+        view = memoryview(chunk)
+        try:
+            while view:
+                view = view[os.write(self._write_fd, view):]
+        except BrokenPipeError:
+            # The extractor failed and closed its end; the error is reported by finish()
+            self._close_pipe()
+
+    def _close_pipe(self):
+        if self._write_fd is not None:
+            os.close(self._write_fd)
+            self._write_fd = None
+
+    async def finish(self) -> bool:
+        """Signal the end of the archive and wait; True if the whole archive was extracted"""
+        self._close_pipe()
+        await asyncio.to_thread(self._thread.join)
+        return self.error is None
 
 
 class ProductDownloader:
     """Base class for product downloaders"""
 
-    def __init__(self, name: str):
-        self.name = name
-        self.client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+    __slots__ = ("name", "client", "_cached_version")
 
-    async def close(self):
-        await self.client.aclose()
+    def __init__(self, name: str, session: aiohttp.ClientSession):
+        self.name = name
+        self.client = session
+        self._cached_version: Optional[str] = None
 
     async def get_latest_version(self) -> str:
         """Get the latest version number"""
         raise NotImplementedError
 
+    async def get_cached_latest_version(self) -> str:
+        """Get the latest version number, asking upstream at most once per run"""
+        if self._cached_version is None:
+            self._cached_version = await self.get_latest_version()
+        return self._cached_version
+
+    async def _cached_get(self, url: str, what: str, parse: Optional[Callable[[str], Any]] = None):
+        """
+        GET a manifest as text, revalidating the cached copy with a conditional request.
+        A 304 response carries no body, so the cached body is returned instead.
+
+        With parse, the parsed result is returned and cached in place of the body,
+        so an unchanged manifest is neither transferred nor parsed again.
+        """
+        cache_file = CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+        cached = None
+        if cache_file.exists():
+            try:
+                cached = json.loads(cache_file.read_text())
+            except (OSError, json.JSONDecodeError):
+                cached = None
+
+        # Only revalidate an entry that holds what this caller needs
+        if cached and "body" not in cached and (parse is None or "parsed" not in cached):
+            cached = None
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async def _fetch():
+            async with self.client.get(url, headers=headers) as response:
+                check_transient_status(response)
+                if response.status == 304 and cached:
+                    return response.status, None, None, None
+                assert response.status == 200, f"Failed to get {what}: HTTP {response.status}"
+                return response.status, await response.text(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+        status, body, etag, last_modified = await with_retries(_fetch, f"Fetching {what}")
+        if status == 304:
+            if parse is None:
+                return cached["body"]
+            if "parsed" in cached:
+                return cached["parsed"]
+            return parse(cached["body"])
+
+        entry = {"url": url, "etag": etag, "last_modified": last_modified}
+        if parse is None:
+            result = entry["body"] = body
+        else:
+            result = entry["parsed"] = parse(body)
+
+        if etag or last_modified:
+            CACHE_DIR.mkdir(exist_ok=True)
+            tmp_file = cache_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(entry))
+            tmp_file.replace(cache_file)
+
+        return result
+
+    async def _cached_get_json(self, url: str, what: str):
+        """GET a JSON manifest through the conditional-request cache"""
+        return json.loads(await self._cached_get(url, what))
+
     async def get_download_url(self, version: str, platform: Platform) -> Optional[str]:
         """Get download URL for specific version and platform"""
         raise NotImplementedError
 
-    async def download_file(self, url: str, dest_path: Path, progress: Progress, task_id):
-        """Download a file with progress tracking"""
+    async def download_file(self, url: str, dest_path: Path, progress: Progress, task_id,
+                            extractor: Optional[StreamExtractor] = None) -> DownloadResult:
+        """
+        Download a file with progress tracking.
+        Large files are fetched as parallel byte ranges if the server supports it.
+        Both ways resume the .part file an interrupted run left behind.
+        A download that starts from the first byte is also fed to the extractor, if one is given.
+        """
         dest_path.parent.mkdir(parents=True, exist_ok=True)
 
-        async with self.client.stream("GET", url) as response:
-            assert response.status_code == 200, f"Failed to download {url}: HTTP {response.status_code}"
+        async def _probe():
+            async with self.client.head(url, allow_redirects=True) as response:
+                check_transient_status(response)
+                size = int(response.headers.get("content-length", 0)) if response.status == 200 else 0
+                accepts_ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+                return size, accepts_ranges, range_validator(response.headers)
+
+        size, accepts_ranges, validator = await with_retries(_probe, f"Probing {dest_path.name}")
+
+        if accepts_ranges and size > RANGED_DOWNLOAD_THRESHOLD and hasattr(os, "pwrite"):
+            # Pieces are requested from the original URL: redirect targets may be short-lived signed URLs
+            return await self.download_file_ranged(url, dest_path, size, validator, progress, task_id, extractor)
+
+        return await self._download_stream(url, dest_path, progress, task_id, extractor)
+
+    async def download_file_ranged(self, url: str, dest_path: Path, size: int, validator: Optional[str],
+                                   progress: Progress, task_id, extractor: Optional[StreamExtractor] = None,
+                                   connections: int = RANGED_DOWNLOAD_CONNECTIONS) -> DownloadResult:
+        """
+        Download a file of known size as byte ranges over several parallel connections.
+        The file is split into RANGED_PIECE_SIZE pieces which the connections take in turn,
+        each piece is written in place with pwrite.
+        Pieces are hashed and fed to the extractor in file order as soon as they are contiguous
+        with the already hashed prefix, read back while still in the page cache.
+        Finished pieces are recorded next to the .part file, so an interrupted download fetches
+        only the missing ones, as long as the validator (ETag or Last-Modified) still matches.
+        Falls back to a single stream if the server answers a range request with the whole file.
+        """
+        part_path = dest_path.with_name(dest_path.name + ".part")
+        state = load_part_state(part_path)
+        if (validator and state and state.get("validator") == validator and state.get("size") == size
+                and state.get("piece_size") == RANGED_PIECE_SIZE and state.get("pieces") is not None):
+            written = set(state["pieces"])
+        else:
+            # Nothing to resume, or the part holds another version of the file
+            discard_part(part_path)
+            written = set()
+        save_part_state(part_path, {"validator": validator, "size": size, "piece_size": RANGED_PIECE_SIZE,
+                                    "pieces": sorted(written)})
+
+        progress.update(task_id, total=size, completed=sum(min(RANGED_PIECE_SIZE, size - start) for start in written))
+
+        pieces = iter([start for start in range(0, size, RANGED_PIECE_SIZE) if start not in written])
+        reporter = ProgressReporter(progress, task_id)
+        ranges_ignored = False
+        digest = hashlib.sha256()
+        # Pieces already on disk are hashed (and fed to the extractor) first, in file order
+        completed = set(written)
+        hashed_to = 0
+        hash_lock = asyncio.Lock()
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+
+            def _hash_piece(start: int, length: int):
+                data = os.pread(fd, length, start)
+                digest.update(data)
+                if extractor:
+                    extractor.feed(data)
+
+            async def _drain():
+                nonlocal hashed_to
+                # One connection at a time drains the pieces contiguous with the hashed prefix,
+                # including ones finished meanwhile; the others go on downloading
+                if hash_lock.locked():
+                    return
+                async with hash_lock:
+                    while hashed_to in completed:
+                        completed.remove(hashed_to)
+                        length = min(RANGED_PIECE_SIZE, size - hashed_to)
+                        await run_disk_io(_hash_piece, hashed_to, length)
+                        hashed_to += length
+
+            # Content changed since the part was written makes the server send the whole file
+            range_headers = {"If-Range": validator} if validator else {}
+
+            async def _fetch_piece(start: int, end: int):
+                pos = start
+
+                async def _attempt():
+                    nonlocal pos
+                    # A retry asks only for the bytes of the piece not written yet
+                    headers = {"Range": f"bytes={pos}-{end}", **range_headers}
+                    async with self.client.get(url, headers=headers) as response:
+                        if response.status == 200:
+                            raise RangesNotSupported(url)
+                        check_transient_status(response)
+                        assert response.status == 206, f"Failed to download range {start}-{end} of {url}: HTTP {response.status}"
+
+                        async for chunk in read_chunks(response.content):
+                            await run_disk_io(os.pwrite, fd, chunk, pos)
+                            pos += len(chunk)
+                            reporter.advance(len(chunk))
+
+                await with_retries(_attempt, f"Range {start}-{end} of {dest_path.name}")
+                assert pos == end + 1, f"Incomplete range {start}-{end} of {url}: got {pos - start} bytes"
+
+            async def _fetch_pieces():
+                # Every connection pulls the next piece from the shared iterator until none are left
+                for start in pieces:
+                    await _fetch_piece(start, min(start + RANGED_PIECE_SIZE, size) - 1)
+                    written.add(start)
+                    completed.add(start)
+                    await _drain()
+
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(_drain())
+                remaining = -(-size // RANGED_PIECE_SIZE) - len(written)
+                for _ in range(min(connections, remaining)):
+                    tg.create_task(_fetch_pieces())
+        except* RangesNotSupported:
+            ranges_ignored = True
+        except* Exception as eg:
+            # Surface the first failed piece itself rather than the TaskGroup wrapper
+            error = eg.exceptions[0]
+            while isinstance(error, ExceptionGroup):
+                error = error.exceptions[0]
+            raise error
+        finally:
+            reporter.flush()
+            os.close(fd)
+            if not ranges_ignored:
+                # Keep what was finished for the next run; unfinished pieces are fetched again
+                save_part_state(part_path, {"validator": validator, "size": size, "piece_size": RANGED_PIECE_SIZE,
+                                            "pieces": sorted(written)})
+
+        if ranges_ignored:
+            console.print(f"    [dim]Server sent the whole file for a range request, downloading {dest_path.name} as one stream[/dim]")
+            discard_part(part_path)
+            progress.update(task_id, completed=0)
+            # An extractor that already got a prefix cannot start over; it fails and the archive is unpacked afterwards
+            return await self._download_stream(url, dest_path, progress, task_id, None if hashed_to else extractor)
+
+        assert hashed_to == size, f"Only {hashed_to} of {size} bytes of {url} were hashed"
+        part_path.replace(dest_path)
+        part_state_path(part_path).unlink(missing_ok=True)
+        return DownloadResult(dest_path, size, digest.hexdigest())
+
+    async def _download_stream(self, url: str, dest_path: Path, progress: Progress, task_id,
+                               extractor: Optional[StreamExtractor] = None) -> DownloadResult:
+        """
+        Download a file as a single stream, retrying transient failures.
+        Each retry resumes from the bytes already in the .part file.
+        """
+        return await with_retries(
+            lambda: self._download_stream_attempt(url, dest_path, progress, task_id, extractor),
+            f"Downloading {dest_path.name}",
+        )
 
-            total_size = int(response.headers.get("content-length", 0))
-            progress.update(task_id, total=total_size)
+    async def _download_stream_attempt(self, url: str, dest_path: Path, progress: Progress, task_id,
+                                       extractor: Optional[StreamExtractor] = None) -> DownloadResult:
+        """
+        Download a file as a single stream into a .part file, resuming a previous partial download.
+        A resume sends If-Range with the validator the part was downloaded with,
+        so a file changed upstream is sent whole instead of being appended to the old part.
+        The SHA-256 digest is computed from the chunks as they are written.
+        A download that starts from the first byte is also fed to the extractor.
+        """
+        part_path = dest_path.with_name(dest_path.name + ".part")
+        state = load_part_state(part_path)
+        if state and state.get("validator") and state.get("pieces") is None:
+            resume_from = part_path.stat().st_size
+        else:
+            # No part, a ranged part with gaps, or a part that cannot be checked against the remote file
+            discard_part(part_path)
+            resume_from = 0
+        headers = {"Range": f"bytes={resume_from}-", "If-Range": state["validator"]} if resume_from else {}
+
+        async with self.client.get(url, headers=headers) as response:
+            if response.status == 416 or (
+                response.status == 206 and not response.headers.get("Content-Range", "").startswith(f"bytes {resume_from}-")
+            ):
+                # The partial file does not fit the remote file, start over
+                discard_part(part_path)
+                return await self._download_stream_attempt(url, dest_path, progress, task_id, extractor)
+
+            check_transient_status(response)
+            assert response.status in (200, 206), f"Failed to download {url}: HTTP {response.status}"
+            if response.status == 200:
+                # The server ignored the range or the file changed, the whole file is sent again
+                resume_from = 0
+                save_part_state(part_path, {"validator": range_validator(response.headers), "pieces": None})
+
+            content_length = int(response.headers.get("content-length", 0))
+            total_size = resume_from + content_length if content_length else 0
+            # With a content encoding the length counts encoded bytes, not the ones written
+            expected_size = total_size if "content-encoding" not in response.headers else 0
+            progress.update(task_id, total=total_size, completed=resume_from)
+
+            if resume_from:
+                # Continue the digest over the bytes already on disk
+                def _hash_existing():
+                    with open(part_path, "rb") as f:
+                        return hashlib.file_digest(f, "sha256")
+                digest = await run_disk_io(_hash_existing)
+            else:
+                digest = hashlib.sha256()
 
-            with open(dest_path, "wb") as f:
-                downloaded = 0
-                async for chunk in response.aiter_bytes(chunk_size=8192):
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    progress.update(task_id, advance=len(chunk))
+            # A resumed download misses the start of the archive, so it is unpacked afterwards instead
+            feed = extractor.feed if extractor is not None and not resume_from else None
+
+            # Chunks are already large, so write them straight through without buffering.
+            # No preallocation here: the .part file size is the resume position.
+            with open(part_path, "ab" if resume_from else "wb", buffering=0) as f:
+                downloaded = resume_from
+                reporter = ProgressReporter(progress, task_id)
 
-        return dest_path
+                # Writing and hashing run on a disk I/O thread fed through a bounded queue,
+                # so the socket keeps being read while the previous chunk is persisted
+                queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+
+                def _write(chunk: bytes):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    if feed:
+                        feed(chunk)
+
+                async def _writer():
+                    while (chunk := await queue.get()) is not None:
+                        await run_disk_io(_write, chunk)
+
+                try:
+                    async with asyncio.TaskGroup() as tg:
+                        tg.create_task(_writer())
+                        async for chunk in read_chunks(response.content):
+                            await queue.put(chunk)
+                            downloaded += len(chunk)
+                            reporter.advance(len(chunk))
+                        await queue.put(None)
+                except ExceptionGroup as eg:
+                    # Surface a single failure as itself, so a dropped connection can be retried
+                    if len(eg.exceptions) == 1:
+                        raise eg.exceptions[0]
+                    raise
+
+                reporter.flush()
+
+        # A short file stays a .part file and is resumed next time
+        assert not expected_size or downloaded == expected_size, \
+            f"Incomplete download of {url}: got {downloaded} of {expected_size} bytes"
+        part_path.replace(dest_path)
+        part_state_path(part_path).unlink(missing_ok=True)
+        return DownloadResult(dest_path, downloaded, digest.hexdigest())
 
 
 class VSCodeDownloader(ProductDownloader):
     """Downloader for official Microsoft VSCode"""
 
-    def __init__(self):
-        super().__init__("vscode")
+    __slots__ = ("base_url",)
+
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__("vscode", session)
         self.base_url = "https://update.code.visualstudio.com"
 
     async def get_latest_version(self) -> str:
         """Get latest VSCode version"""
         # Use the update API to get latest version
         url = f"{self.base_url}/api/update/linux-x64/stable/latest"
-        response = await self.client.get(url)
-        assert response.status_code == 200, f"Failed to get VSCode version: HTTP {response.status_code}"
-        data = response.json()
+        data = await self._cached_get_json(url, "VSCode version")
         version = data.get("productVersion")
         assert version, "No version found in VSCode API response"
         return version
@@ -196,56 +855,94 @@ class VSCodeDownloader(ProductDownloader):
 class VSCodiumDownloader(ProductDownloader):
     """Downloader for VSCodium"""
 
-    def __init__(self):
-        super().__init__("vscodium")
+    # Release asset name patterns per (os, arch)
+    ASSET_PATTERNS = {
+        ("windows", "x64"): r"win32-x64.*\.zip",
+        ("windows", "arm64"): r"win32-arm64.*\.zip",
+        ("linux", "x64"): r"linux-x64.*\.tar\.gz",
+        ("linux", "arm64"): r"linux-arm64.*\.tar\.gz",
+        ("darwin", "x64"): r"darwin-x64.*\.zip",
+        ("darwin", "arm64"): r"darwin-arm64.*\.zip",
+    }
+
+    # All patterns as one alternation; the named group "{os}_{arch}" tells which one matched
+    ASSET_RE = re.compile(
+        r"VSCodium.*(?:"
+        + "|".join(f"(?P<{os_name}_{arch}>{pattern})" for (os_name, arch), pattern in ASSET_PATTERNS.items())
+        + r")$",
+        re.IGNORECASE,
+    )
+
+    __slots__ = ("repo", "_release", "_release_cache", "_asset_urls")
+
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__("vscodium", session)
         self.repo = "VSCodium/vscodium"
+        self._release = None
+        # Release JSON per version; one response lists the assets of all platforms
+        self._release_cache: Dict[str, asyncio.Task] = {}
+        # Download URL per (os, arch), per version
+        self._asset_urls: Dict[str, Dict[Tuple[str, str], str]] = {}
+
+    async def _get_release(self) -> dict:
+        """Fetch and cache the latest release, including its assets"""
+        if self._release is None:
+            url = f"https://api.github.com/repos/{self.repo}/releases/latest"
+            self._release = await self._cached_get_json(url, "VSCodium version")
+        return self._release
 
     async def get_latest_version(self) -> str:
         """Get latest VSCodium version from GitHub"""
-        url = f"https://api.github.com/repos/{self.repo}/releases/latest"
-        response = await self.client.get(url)
-        assert response.status_code == 200, f"Failed to get VSCodium version: HTTP {response.status_code}"
-        data = response.json()
-        version = data.get("tag_name", "").lstrip("v")
+        release = await self._get_release()
+        version = release.get("tag_name", "").lstrip("v")
         assert version, "No version found in VSCodium release"
         return version
 
+    async def _fetch_release(self, version: str) -> dict:
+        """Fetch the GitHub release for a version"""
+        url = f"https://api.github.com/repos/{self.repo}/releases/tags/{version}"
+        async def _fetch():
+            async with self.client.get(url) as response:
+                check_transient_status(response)
+                assert response.status == 200, f"Failed to get VSCodium release: HTTP {response.status}"
+                return await response.json()
+
+        return await with_retries(_fetch, f"Fetching VSCodium release {version}")
+
+    @classmethod
+    def _index_assets(cls, release: dict) -> Dict[Tuple[str, str], str]:
+        """Map (os, arch) to the download URL with a single pass over the release assets"""
+        urls = {}
+        for asset in release.get("assets", []):
+            match = cls.ASSET_RE.search(asset.get("name", ""))
+            if match:
+                # The first matching asset wins for each platform
+                urls.setdefault(tuple(match.lastgroup.split("_", 1)), asset.get("browser_download_url"))
+        return urls
+
     async def get_download_url(self, version: str, platform: Platform) -> Optional[str]:
         """Get VSCodium download URL from GitHub releases"""
-        url = f"https://api.github.com/repos/{self.repo}/releases/tags/{version}"
-        response = await self.client.get(url)
-        assert response.status_code == 200, f"Failed to get VSCodium release: HTTP {response.status_code}"
-
-        data = response.json()
-        assets = data.get("assets", [])
-
-        # Look for appropriate asset
-        patterns = {
-            ("windows", "x64"): r"VSCodium.*win32-x64.*\.zip$",
-            ("windows", "arm64"): r"VSCodium.*win32-arm64.*\.zip$",
-            ("linux", "x64"): r"VSCodium.*linux-x64.*\.tar\.gz$",
-            ("linux", "arm64"): r"VSCodium.*linux-arm64.*\.tar\.gz$",
-            ("darwin", "x64"): r"VSCodium.*darwin-x64.*\.zip$",
-            ("darwin", "arm64"): r"VSCodium.*darwin-arm64.*\.zip$",
-        }
+        if version not in self._asset_urls:
+            data = await self._get_release()
+            if data.get("tag_name", "").lstrip("v") != version:
+                # Not the latest release; cache the task rather than the result,
+                # so concurrent platforms share one request
+                if version not in self._release_cache:
+                    self._release_cache[version] = asyncio.create_task(self._fetch_release(version))
+                data = await self._release_cache[version]
 
-        pattern = patterns.get((platform.os_name, platform.arch))
-        if not pattern:
-            return None
+            self._asset_urls[version] = self._index_assets(data)
 
-        for asset in assets:
-            name = asset.get("name", "")
-            if re.search(pattern, name, re.IGNORECASE):
-                return asset.get("browser_download_url")
-
-        return None
+        return self._asset_urls[version].get((platform.os_name, platform.arch))
 
 
 class CursorDownloader(ProductDownloader):
     """Downloader for Cursor IDE"""
 
-    def __init__(self):
-        super().__init__("cursor")
+    __slots__ = ("version_url", "_version_data")
+
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__("cursor", session)
         # Use the version history from GitHub repo
         self.version_url = "https://raw.githubusercontent.com/accesstechnology-mike/cursor-downloads/main/version-history.json"
         self._version_data = None
@@ -253,9 +950,7 @@ class CursorDownloader(ProductDownloader):
     async def _get_version_data(self):
         """Fetch and cache version data"""
         if self._version_data is None:
-            response = await self.client.get(self.version_url)
-            assert response.status_code == 200, f"Failed to get Cursor versions: HTTP {response.status_code}"
-            data = response.json()
+            data = await self._cached_get_json(self.version_url, "Cursor versions")
             versions = data.get("versions", [])
             assert len(versions) > 0, "No versions found in Cursor version history"
             self._version_data = versions
@@ -311,38 +1006,41 @@ class CursorDownloader(ProductDownloader):
 class WindsurfDownloader(ProductDownloader):
     """Downloader for Windsurf Editor"""
 
-    def __init__(self):
-        super().__init__("windsurf")
+    __slots__ = ("releases_url", "_version_info")
+
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__("windsurf", session)
         self.releases_url = "https://windsurf.com/windsurf/releases"
         self._version_info = None
 
+    @staticmethod
+    def _parse_releases_page(html: str) -> dict:
+        """Extract version and commit from a download URL on the releases page"""
+        # Locate candidate URLs by their fixed prefix and match only there, not across the whole page
+        match = None
+        index = html.find(WINDSURF_DOWNLOAD_PREFIX)
+        while index != -1 and not match:
+            match = WINDSURF_DOWNLOAD_RE.match(html, index, index + 512)
+            index = html.find(WINDSURF_DOWNLOAD_PREFIX, index + 1)
+
+        assert match, "Could not find version and commit in Windsurf releases page"
+
+        commit_hash = match.group(1)
+        version = match.group(2)
+
+        return {
+            "version": version,
+            "commit": commit_hash,
+        }
+
     async def _get_version_info(self):
         """Fetch version info by scraping releases page"""
         if self._version_info is None:
-            # Fetch the releases page
-            response = await self.client.get(self.releases_url)
-            assert response.status_code == 200, f"Failed to get Windsurf releases page: HTTP {response.status_code}"
-
-            html = response.text
-
-            # Extract a download URL to parse version and commit
-            # Pattern: https://windsurf-stable.codeiumdata.com/{platform}/stable/{commit}/{filename}
-            import re
-            match = re.search(
-                r'https://windsurf-stable\.codeiumdata\.com/[^/]+/stable/([a-f0-9]+)/[^-]+-[^-]+-[^-]+-(\d+\.\d+\.\d+)\.',
-                html
+            # An unchanged page is answered with 304 and the version info parsed last time
+            self._version_info = await self._cached_get(
+                self.releases_url, "Windsurf releases page", parse=self._parse_releases_page
             )
 
-            assert match, "Could not find version and commit in Windsurf releases page"
-
-            commit_hash = match.group(1)
-            version = match.group(2)
-
-            self._version_info = {
-                "version": version,
-                "commit": commit_hash,
-            }
-
         return self._version_info
 
     async def get_latest_version(self) -> str:
@@ -377,18 +1075,49 @@ class WindsurfDownloader(ProductDownloader):
         return f"{base}/{path_platform}/stable/{commit_hash}/Windsurf-{filename_platform}-{version}.{ext}"
 
 
+def find_executables(names: List[str]) -> Dict[str, Path]:
+    """
+    Find several executables with a single pass over PATH.
+    Like shutil.which, the first match on PATH wins; on Windows ".exe" names are matched too.
+    """
+    wanted = {}
+    for name in names:
+        wanted[name] = name
+        if sys.platform == "win32":
+            wanted[f"{name}.exe"] = name
+
+    found = {}
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if not directory:
+            continue
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                name = wanted.get(entry.name)
+                if name and name not in found and entry.is_file() and os.access(entry.path, os.X_OK):
+                    found[name] = Path(entry.path)
+        if len(found) == len(names):
+            break
+
+    return found
+
+
 async def ensure_extraction_tools():
     """
-    Ensure extraction tools (unsquashfs, 7z, innoextract) are available.
+    Ensure extraction tools (unsquashfs, 7z, pigz, innoextract) are available.
     First checks system PATH, then downloads if needed.
     Returns dict with tool paths.
     """
     tools = {}
+    found = find_executables(["unsquashfs", "7z", "7za", "7zz", "pigz", "innoextract"])
 
     # Check for unsquashfs
-    unsquashfs_path = shutil.which("unsquashfs")
+    unsquashfs_path = found.get("unsquashfs")
     if unsquashfs_path:
-        tools["unsquashfs"] = Path(unsquashfs_path)
+        tools["unsquashfs"] = unsquashfs_path
         console.print(f"[dim]Found unsquashfs: {unsquashfs_path}[/dim]")
     else:
         console.print("[yellow]unsquashfs not found in PATH[/yellow]")
@@ -396,19 +1125,27 @@ async def ensure_extraction_tools():
 
     # Check for 7z/7za/7zz
     for cmd in ["7z", "7za", "7zz"]:
-        tool_path = shutil.which(cmd)
+        tool_path = found.get(cmd)
         if tool_path:
-            tools["7z"] = Path(tool_path)
+            tools["7z"] = tool_path
             console.print(f"[dim]Found {cmd}: {tool_path}[/dim]")
             break
     else:
         console.print("[yellow]7z not found in PATH[/yellow]")
         console.print("[yellow]Install with: brew install p7zip (macOS) or apt-get install p7zip-full (Linux)[/yellow]")
 
+    # Check for pigz (parallel gzip decompression for TAR.GZ archives)
+    pigz_path = found.get("pigz")
+    if pigz_path:
+        tools["pigz"] = pigz_path
+        console.print(f"[dim]Found pigz: {pigz_path}[/dim]")
+    else:
+        console.print("[dim]pigz not found in PATH, TAR.GZ archives will be decompressed in-process[/dim]")
+
     # Check for innoextract
-    innoextract_path = shutil.which("innoextract")
+    innoextract_path = found.get("innoextract")
     if innoextract_path:
-        tools["innoextract"] = Path(innoextract_path)
+        tools["innoextract"] = innoextract_path
         console.print(f"[dim]Found innoextract: {innoextract_path}[/dim]")
     else:
         console.print("[yellow]innoextract not found in PATH[/yellow]")
@@ -417,6 +1154,70 @@ async def ensure_extraction_tools():
     return tools
 
 
+def write_squashfs_tail(data: mmap.mmap, offset: int, dest_path: Path):
+    """
+    Copy the mapped AppImage from offset to the end into dest_path.
+    Copies in 1 MiB windows so the tail is never materialized as one bytes object.
+    """
+    with open(dest_path, 'wb') as f:
+        for pos in range(offset, len(data), SQUASHFS_COPY_CHUNK):
+            f.write(data[pos:pos + SQUASHFS_COPY_CHUNK])
+
+
+def find_appimage_squashfs_offset(data: mmap.mmap) -> Optional[int]:
+    """
+    Locate the SquashFS filesystem of a type-2 AppImage from its ELF header.
+    The runtime ends with its section header table, so the filesystem starts at
+    e_shoff + e_shentsize * e_shnum. Returns None if there is no SquashFS there.
+    """
+    if len(data) < 64 or data[:4] != b'\x7fELF':
+        return None
+
+    byte_order = '<' if data[5] == 1 else '>'  # EI_DATA: 1 = little endian
+    if data[4] == 2:  # ELFCLASS64
+        fields = struct.unpack(byte_order + 'HHIQQQIHHHHHH', data[16:64])
+    elif data[4] == 1:  # ELFCLASS32
+        fields = struct.unpack(byte_order + 'HHIIIIIHHHHHH', data[16:52])
+    else:
+        return None
+
+    e_shoff, e_shentsize, e_shnum = fields[5], fields[10], fields[11]
+    offset = e_shoff + e_shentsize * e_shnum
+
+    if data[offset:offset + 4] != b'hsqs':
+        return None
+    return offset
+
+
+def libarchive_extract(archive_path: Path, extract_dir: Path) -> int:
+    """
+    Extract an archive in-process with libarchive, streaming entries to disk.
+    Returns the number of extracted entries; raises if libarchive cannot read the file.
+    """
+    entry_count = 0
+    with libarchive.file_reader(str(archive_path)) as archive:
+        for entry in archive:
+            # Extract each entry
+            dest_path = extract_dir / entry.pathname.lstrip('/')
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+            if entry.isdir:
+                dest_path.mkdir(parents=True, exist_ok=True)
+            elif entry.isfile or entry.islnk:
+                with open(dest_path, 'wb') as f:
+                    for block in entry.get_blocks():
+                        f.write(block)
+
+                # Preserve permissions if available
+                if entry.mode:
+                    with contextlib.suppress(OSError):
+                        dest_path.chmod(entry.mode & 0o777)
+
+            entry_count += 1
+
+    return entry_count
+
+
 def extract_appimage_with_unsquashfs(appimage_path: Path, extract_dir: Path, unsquashfs_path: Path) -> bool:
     """
     Extract AppImage using unsquashfs binary.
@@ -424,62 +1225,57 @@ def extract_appimage_with_unsquashfs(appimage_path: Path, extract_dir: Path, uns
     try:
         console.print(f"    Extracting AppImage with unsquashfs: {appimage_path.name}")
 
-        # Read the AppImage file to find SquashFS offset
-        with open(appimage_path, 'rb') as f:
-            data = f.read()
-
-        # Find SquashFS magic signature
-        # AppImages often have the magic bytes in the code section, so we need to find
-        # the actual SquashFS header which is typically aligned on a reasonable boundary
-        squashfs_magic = b'hsqs'
-
-        # Find all occurrences of the magic bytes
-        offsets = []
-        start = 0
-        while True:
-            offset = data.find(squashfs_magic, start)
-            if offset == -1:
-                break
-            offsets.append(offset)
-            start = offset + 1
-
-        if not offsets:
-            console.print(f"    [yellow]Could not find SquashFS in AppImage[/yellow]")
-            return False
+        # Map the AppImage file to find SquashFS offset; pages are loaded on demand
+        with open(appimage_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # The ELF header tells exactly where the filesystem starts
+            offset = find_appimage_squashfs_offset(data)
+            if offset is not None:
+                offsets = [offset]
+            else:
+                # Find SquashFS magic signature
+                # AppImages often have the magic bytes in the code section, so we need to find
+                # the actual SquashFS header which is typically aligned on a reasonable boundary
+                squashfs_magic = b'hsqs'
+
+                # Find all occurrences of the magic bytes
+                offsets = []
+                start = 0
+                while True:
+                    offset = data.find(squashfs_magic, start)
+                    if offset == -1:
+                        break
+                    offsets.append(offset)
+                    # "hsqs" cannot overlap itself, so continue after the whole match
+                    start = offset + len(squashfs_magic)
+
+            if not offsets:
+                console.print(f"    [yellow]Could not find SquashFS in AppImage[/yellow]")
+                return False
 
         # Try offsets in reverse order (later ones are more likely to be the actual filesystem)
         # or offsets that are aligned on 4-byte boundaries
         offsets.sort(reverse=True)
         console.print(f"    Found {len(offsets)} potential SquashFS locations, trying in reverse order")
 
-        # Try each offset until one works
-        temp_squashfs = extract_dir.parent / f"{appimage_path.stem}.squashfs"
+        # Try each offset until one works; unsquashfs reads the filesystem
+        # straight from the AppImage at the given offset, so nothing is copied
         for offset in offsets:
-            # Extract the SquashFS portion to a temporary file
-            with open(temp_squashfs, 'wb') as f:
-                f.write(data[offset:])
-
-            # Use unsquashfs to extract
             result = subprocess.run(
-                [str(unsquashfs_path), "-f", "-d", str(extract_dir), str(temp_squashfs)],
-                capture_output=True,
+                [str(unsquashfs_path), "-f", "-o", str(offset), "-d", str(extract_dir), str(appimage_path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 text=True
             )
 
             if result.returncode == 0:
                 # Success!
-                temp_squashfs.unlink()
                 console.print(f"    Successfully extracted AppImage with unsquashfs (offset: {offset})")
                 return True
 
-        # Clean up temp file
-        if temp_squashfs.exists():
-            temp_squashfs.unlink()
-
         console.print(f"    [red]unsquashfs failed for all {len(offsets)} potential offsets[/red]")
         return False
 
-    except Exception as e:
+    except EXTRACTION_ERRORS as e:
         console.print(f"    [red]Failed to extract with unsquashfs: {e}[/red]")
         return False
 
@@ -497,24 +1293,23 @@ def extract_appimage(appimage_path: Path, extract_dir: Path, tools: dict) -> boo
     try:
         console.print(f"    Extracting AppImage: {appimage_path.name}")
 
-        # Read the AppImage file
-        with open(appimage_path, 'rb') as f:
-            data = f.read()
-
-        # Find SquashFS magic signature: "hsqs" (0x68737173)
-        squashfs_magic = b'hsqs'
-        offset = data.find(squashfs_magic)
+        # Map the AppImage file
+        with open(appimage_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Use the ELF header first, then fall back to the SquashFS magic signature: "hsqs" (0x68737173)
+            offset = find_appimage_squashfs_offset(data)
+            if offset is None:
+                squashfs_magic = b'hsqs'
+                offset = data.find(squashfs_magic)
 
-        if offset == -1:
-            console.print(f"    [yellow]Could not find SquashFS in AppImage[/yellow]")
-            return False
+            if offset == -1:
+                console.print(f"    [yellow]Could not find SquashFS in AppImage[/yellow]")
+                return False
 
-        console.print(f"    Found SquashFS at offset: {offset}")
+            console.print(f"    Found SquashFS at offset: {offset}")
 
-        # Extract the SquashFS portion to a temporary file
-        temp_squashfs = extract_dir.parent / f"{appimage_path.stem}.squashfs"
-        with open(temp_squashfs, 'wb') as f:
-            f.write(data[offset:])
+            # Extract the SquashFS portion to a temporary file
+            temp_squashfs = extract_dir.parent / f"{appimage_path.stem}.squashfs"
+            write_squashfs_tail(data, offset, temp_squashfs)
 
         # Ensure extract directory doesn't exist yet
         if extract_dir.exists():
@@ -534,49 +1329,30 @@ def extract_appimage(appimage_path: Path, extract_dir: Path, tools: dict) -> boo
 
         except Exception as e:
             console.print(f"    [yellow]PySquashfsImage failed: {e}[/yellow]")
-            if temp_squashfs.exists():
-                temp_squashfs.unlink()
 
             # Try direct extraction with libarchive on the temp squashfs file
             try:
                 console.print(f"    Trying libarchive on SquashFS...")
-                with libarchive.file_reader(str(temp_squashfs)) as archive:
-                    entry_count = 0
-                    for entry in archive:
-                        # Extract each entry
-                        dest_path = extract_dir / entry.pathname.lstrip('/')
-                        dest_path.parent.mkdir(parents=True, exist_ok=True)
-
-                        if entry.isdir:
-                            dest_path.mkdir(parents=True, exist_ok=True)
-                        elif entry.isfile or entry.islnk:
-                            with open(dest_path, 'wb') as f:
-                                for block in entry.get_blocks():
-                                    f.write(block)
-
-                            # Preserve permissions
-                            if entry.mode:
-                                try:
-                                    dest_path.chmod(entry.mode & 0o777)
-                                except:
-                                    pass
-
-                        entry_count += 1
-
-                    if entry_count > 0:
-                        console.print(f"    Successfully extracted {entry_count} files with libarchive")
-                        return True
-                    else:
-                        console.print(f"    [yellow]No files found in SquashFS[/yellow]")
-                        return False
+                entry_count = libarchive_extract(temp_squashfs, extract_dir)
+
+                if entry_count > 0:
+                    console.print(f"    Successfully extracted {entry_count} files with libarchive")
+                    return True
+                else:
+                    console.print(f"    [yellow]No files found in SquashFS[/yellow]")
+                    return False
 
-            except Exception as e2:
+            except EXTRACTION_ERRORS as e2:
                 console.print(f"    [yellow]libarchive also failed: {e2}[/yellow]")
                 # AppImage extraction failed, but keep the AppImage binary as fallback
                 console.print(f"    [dim]Keeping AppImage binary (can be executed directly on Linux)[/dim]")
                 return True  # Consider this a partial success
 
-    except Exception as e:
+            finally:
+                if temp_squashfs.exists():
+                    temp_squashfs.unlink()
+
+    except EXTRACTION_ERRORS as e:
         console.print(f"    [red]Failed to process AppImage: {e}[/red]")
         return False
 
@@ -589,22 +1365,22 @@ def extract_with_innoextract(exe_path: Path, extract_dir: Path, tool_path: Path)
         console.print(f"    Extracting with innoextract: {exe_path.name}")
 
         result = subprocess.run(
-            [str(tool_path), "-e", "-d", str(extract_dir), str(exe_path)],
-            capture_output=True,
+            [str(tool_path), "-e", "--silent", "-d", str(extract_dir), str(exe_path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True
         )
 
         if result.returncode == 0:
             # Check if files were extracted (innoextract creates an 'app' subdirectory)
-            extracted_files = list(extract_dir.rglob("*"))
-            if len(extracted_files) > 0:
-                console.print(f"    Successfully extracted {len(extracted_files)} items with innoextract")
+            if any(extract_dir.iterdir()):
+                console.print(f"    Successfully extracted with innoextract")
                 return True
 
         console.print(f"    [yellow]innoextract failed: {result.stderr[:200]}[/yellow]")
         return False
 
-    except Exception as e:
+    except EXTRACTION_ERRORS as e:
         console.print(f"    [yellow]Failed to extract with innoextract: {e}[/yellow]")
         return False
 
@@ -618,15 +1394,15 @@ def extract_exe_with_7z(exe_path: Path, extract_dir: Path, tool_path: Path) -> b
 
         result = subprocess.run(
             [str(tool_path), "x", f"-o{extract_dir}", str(exe_path), "-y"],
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True
         )
 
         if result.returncode == 0:
             # Check if files were extracted
-            extracted_files = list(extract_dir.rglob("*"))
-            if len(extracted_files) > 0:
-                console.print(f"    Successfully extracted {len(extracted_files)} files with 7z")
+            if any(extract_dir.iterdir()):
+                console.print(f"    Successfully extracted with 7z")
                 return True
             else:
                 console.print(f"    [yellow]No files extracted[/yellow]")
@@ -635,14 +1411,14 @@ def extract_exe_with_7z(exe_path: Path, extract_dir: Path, tool_path: Path) -> b
             console.print(f"    [yellow]7z extraction failed: {result.stderr}[/yellow]")
             return False
 
-    except Exception as e:
+    except EXTRACTION_ERRORS as e:
         console.print(f"    [red]Failed to extract with 7z: {e}[/red]")
         return False
 
 
 def extract_nsis_installer(exe_path: Path, extract_dir: Path, tools: dict) -> bool:
     """
-    Try to extract Windows installer using innoextract first, then 7z, then py7zr, then libarchive.
+    Try to extract Windows installer using innoextract first, then libarchive, then 7z, then py7zr.
     Many Windows installers use Inno Setup, NSIS, or other formats that can be extracted.
     """
     # Try innoextract first if available (best for Inno Setup installers like VSCode)
@@ -650,6 +1426,20 @@ def extract_nsis_installer(exe_path: Path, extract_dir: Path, tools: dict) -> bo
         if extract_with_innoextract(exe_path, extract_dir, tools["innoextract"]):
             return True
 
+    # Try libarchive in-process before forking external tools (supports many formats)
+    try:
+        console.print(f"    Extracting with libarchive: {exe_path.name}")
+        entry_count = libarchive_extract(exe_path, extract_dir)
+
+        if entry_count > 0:
+            console.print(f"    Successfully extracted {entry_count} entries with libarchive")
+            return True
+        else:
+            console.print(f"    [dim]libarchive found no entries in installer[/dim]")
+
+    except EXTRACTION_ERRORS as e:
+        console.print(f"    [dim]libarchive failed: {e}[/dim]")
+
     # Try 7z binary if available (works for some installers, but limited for Inno Setup)
     if "7z" in tools:
         if extract_exe_with_7z(exe_path, extract_dir, tools["7z"]):
@@ -665,53 +1455,109 @@ def extract_nsis_installer(exe_path: Path, extract_dir: Path, tools: dict) -> bo
         console.print(f"    Successfully extracted with py7zr")
         return True
 
-    except Exception as e:
-        console.print(f"    [dim]py7zr failed: {e}[/dim]")
+    except (py7zr.Bad7zFile, *EXTRACTION_ERRORS) as e:
+        console.print(f"    [yellow]Could not extract installer: {e}[/yellow]")
+        return False
 
-    # Try libarchive (supports more formats)
-    try:
-        console.print(f"    Extracting with libarchive: {exe_path.name}")
 
-        with libarchive.file_reader(str(exe_path)) as archive:
-            entry_count = 0
-            for entry in archive:
-                # Extract each entry
-                dest_path = extract_dir / entry.pathname.lstrip('/')
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-
-                if entry.isdir:
-                    dest_path.mkdir(parents=True, exist_ok=True)
-                elif entry.isfile or entry.islnk:
-                    with open(dest_path, 'wb') as f:
-                        for block in entry.get_blocks():
-                            f.write(block)
-
-                    # Preserve permissions if available
-                    if entry.mode:
-                        try:
-                            dest_path.chmod(entry.mode & 0o777)
-                        except:
-                            pass
-
-                entry_count += 1
+def extract_zip(archive_path: Path, extract_dir: Path):
+    """
+    Extract a ZIP member by member with a 1 MiB copy buffer.
+    Unix permission bits are restored so executables in app bundles stay executable.
+    """
+    with zipfile.ZipFile(archive_path, 'r') as z:
+        for info in z.infolist():
+            # Never write outside extract_dir (absolute names or ".." components)
+            name = os.path.normpath(info.filename)
+            if os.path.isabs(name) or name == ".." or name.startswith(".." + os.sep):
+                console.print(f"    [yellow]Skipping unsafe ZIP entry: {info.filename}[/yellow]")
+                continue
+            dest_path = extract_dir / name
 
-        if entry_count > 0:
-            console.print(f"    Successfully extracted {entry_count} entries with libarchive")
-            return True
-        else:
-            console.print(f"    [yellow]No files extracted from installer[/yellow]")
-            return False
+            if info.is_dir():
+                dest_path.mkdir(parents=True, exist_ok=True)
+                continue
 
-    except Exception as e:
-        console.print(f"    [yellow]Could not extract installer: {e}[/yellow]")
-        return False
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            with z.open(info) as src, open(dest_path, 'wb', buffering=0) as out:
+                shutil.copyfileobj(src, out, length=ZIP_COPY_CHUNK)
+
+            mode = (info.external_attr >> 16) & 0o777
+            if mode:
+                dest_path.chmod(mode)
+
+
+_zip_pool: Optional[ProcessPoolExecutor] = None
+_zip_pool_lock = threading.Lock()
+
+
+def zip_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for ZIP extraction, started on first use.
+    Workers are spawned rather than forked: the parent runs an event loop and worker threads.
+    """
+    global _zip_pool
+    with _zip_pool_lock:
+        if _zip_pool is None:
+            _zip_pool = ProcessPoolExecutor(max_workers=ZIP_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _zip_pool
+
+
+def discard_zip_pool(pool: ProcessPoolExecutor):
+    """Drop a pool broken by a dead worker, so the next ZIP extraction starts a new one"""
+    global _zip_pool
+    with _zip_pool_lock:
+        # Extractions failing on the same broken pool must not drop a pool started since
+        if _zip_pool is pool:
+            _zip_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_tar_gz(archive_path: Path, extract_dir: Path, tools: dict):
+    """
+    Extract a .tar.gz archive as a stream, without seeking.
+    With pigz, decompression runs in a separate process in parallel with extraction.
+    """
+    if "pigz" in tools:
+        with subprocess.Popen(
+            [str(tools["pigz"]), "-dc", str(archive_path)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ) as proc:
+            with tarfile.open(fileobj=proc.stdout, mode='r|', bufsize=TAR_BUFSIZE) as tar_ref:
+                tar_ref.extractall(extract_dir, filter='data')
+
+            # Drain the zero padding after the end-of-archive marker so pigz can exit
+            proc.stdout.read()
+            stderr = proc.stderr.read()
+
+        if proc.returncode != 0:
+            raise tarfile.ReadError(f"pigz failed: {stderr.decode(errors='replace')[:200]}")
+        return
+
+    with open(archive_path, 'rb', buffering=TAR_BUFSIZE) as f:
+        with tarfile.open(fileobj=f, mode='r|gz', bufsize=TAR_BUFSIZE) as tar_ref:
+            tar_ref.extractall(extract_dir, filter='data')
+
+
+def extract_tar_stream(archive_path: Path, extract_dir: Path, compression: str):
+    """Extract an .xz or .zst compressed tar archive as a stream"""
+    with open(archive_path, 'rb', buffering=TAR_BUFSIZE) as f:
+        if compression == "zst":
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode='r|', bufsize=TAR_BUFSIZE) as tar_ref:
+                    tar_ref.extractall(extract_dir, filter='data')
+        else:
+            with tarfile.open(fileobj=f, mode=f'r|{compression}', bufsize=TAR_BUFSIZE) as tar_ref:
+                tar_ref.extractall(extract_dir, filter='data')
 
 
 def unpack_archive(archive_path: Path, extract_dir: Path, tools: dict) -> bool:
     """
     Unpack an archive file to the specified directory.
     Returns True if successful, False otherwise.
-    Supports: .zip, .tar.gz, .tgz, .dmg (macOS only), .exe (NSIS), .AppImage (SquashFS extraction)
+    The format is detected from the file's magic bytes, so misnamed files reach the right extractor.
+    Supports: ZIP, TAR.GZ/XZ/ZST, 7z, CAB, .dmg (macOS only), .exe (NSIS/Inno Setup), .AppImage (SquashFS extraction)
     """
     archive_path = Path(archive_path)
     extract_dir = Path(extract_dir)
@@ -719,45 +1565,64 @@ def unpack_archive(archive_path: Path, extract_dir: Path, tools: dict) -> bool:
     assert archive_path.exists(), f"Archive file not found: {archive_path}"
 
     suffix = archive_path.suffix.lower()
-    name = archive_path.name.lower()
 
     try:
         # Check file magic bytes to determine actual type (some files have misleading extensions)
         with open(archive_path, 'rb') as f:
-            magic_bytes = f.read(4)
-
-        is_pe = magic_bytes[:2] == b'MZ'  # PE/EXE file
-        is_zip = magic_bytes[:2] == b'PK'  # ZIP file
+            magic_bytes = f.read(16)
 
         # Handle different archive types
-        if (suffix == ".zip" or name.endswith(".zip")) and is_zip:
+        if suffix == ".dmg":
+            # DMG files are disk images, we'll leave them as-is
+            # They can be mounted on macOS but don't need extraction
+            # (checked by name: a DMG has no header magic, its trailer is at the end)
+            console.print(f"    DMG file (keeping as-is): {archive_path.name}")
+            return True
+
+        elif magic_bytes.startswith(b'PK'):
             console.print(f"    Unpacking ZIP: {archive_path.name}")
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+            # Inflate in another process so several archives use several cores
+            pool = zip_process_pool()
+            try:
+                pool.submit(extract_zip, archive_path, extract_dir).result()
+            except BrokenProcessPool as e:
+                discard_zip_pool(pool)
+                console.print(f"    [red]Failed to unpack {archive_path.name}: ZIP worker died ({e})[/red]")
+                return False
             return True
 
-        elif (suffix == ".zip" or name.endswith(".zip")) and is_pe:
-            # File has .zip extension but is actually an EXE (VSCode Windows)
-            console.print(f"    File has .zip extension but is actually an EXE installer")
+        elif magic_bytes.startswith(b'MZ'):
+            # PE/EXE installer; VSCode Windows ships one with a .zip extension
+            if suffix != ".exe":
+                console.print(f"    File has {suffix} extension but is actually an EXE installer")
             return extract_nsis_installer(archive_path, extract_dir, tools)
 
-        elif suffix == ".gz" and (name.endswith(".tar.gz") or name.endswith(".tgz")):
+        elif magic_bytes.startswith(b'\x1f\x8b'):
             console.print(f"    Unpacking TAR.GZ: {archive_path.name}")
-            with tarfile.open(archive_path, 'r:gz') as tar_ref:
-                tar_ref.extractall(extract_dir, filter='data')
+            extract_tar_gz(archive_path, extract_dir, tools)
             return True
 
-        elif suffix == ".dmg":
-            # DMG files are disk images, we'll leave them as-is
-            # They can be mounted on macOS but don't need extraction
-            console.print(f"    DMG file (keeping as-is): {archive_path.name}")
+        elif magic_bytes.startswith(b'\xfd7zXZ\x00'):
+            console.print(f"    Unpacking TAR.XZ: {archive_path.name}")
+            extract_tar_stream(archive_path, extract_dir, "xz")
             return True
 
-        elif suffix == ".exe":
-            # Try to extract as NSIS installer (VSCode, VSCodium use NSIS)
-            return extract_nsis_installer(archive_path, extract_dir, tools)
+        elif magic_bytes.startswith(b'\x28\xb5\x2f\xfd'):
+            console.print(f"    Unpacking TAR.ZST: {archive_path.name}")
+            extract_tar_stream(archive_path, extract_dir, "zst")
+            return True
+
+        elif magic_bytes.startswith(b'7z\xbc\xaf\x27\x1c'):
+            console.print(f"    Unpacking 7z: {archive_path.name}")
+            with py7zr.SevenZipFile(archive_path, 'r') as archive:
+                archive.extractall(path=extract_dir)
+            return True
+
+        elif magic_bytes.startswith(b'MSCF'):
+            console.print(f"    Unpacking CAB: {archive_path.name}")
+            return libarchive_extract(archive_path, extract_dir) > 0
 
-        elif name.endswith(".appimage"):
+        elif magic_bytes.startswith(b'\x7fELF'):
             # Extract AppImage by finding and extracting embedded SquashFS
             archive_path.chmod(0o755)  # Make executable first
             return extract_appimage(archive_path, extract_dir, tools)
@@ -766,98 +1631,148 @@ def unpack_archive(archive_path: Path, extract_dir: Path, tools: dict) -> bool:
             console.print(f"    [yellow]Unknown archive type: {archive_path.name}[/yellow]")
             return False
 
-    except Exception as e:
+    except (py7zr.Bad7zFile, *EXTRACTION_ERRORS) as e:
         console.print(f"    [red]Failed to unpack {archive_path.name}: {e}[/red]")
         return False
 
 
-async def download_product(downloader: ProductDownloader, platforms: List[Platform], tools: dict):
-    """Download all versions of a product for specified platforms"""
+async def download_product(downloader: ProductDownloader, platforms: List[Platform], tools: dict, progress: Progress,
+                           up_to_date: bool = False):
+    """
+    Download all versions of a product for specified platforms.
+    A product main() found up to date is skipped without any network request.
+    """
     try:
         console.print(f"\n[bold cyan]Processing {downloader.name}...[/bold cyan]")
 
+        if up_to_date:
+            console.print(f"[green]✓ {downloader.name} up to date[/green] [dim](checked recently, use --force-check to recheck)[/dim]")
+            return
+
+        latest_check = LatestCheck(downloader.name)
+
         # Get latest version
-        version = await downloader.get_latest_version()
+        version = await downloader.get_cached_latest_version()
         console.print(f"Latest version: [green]{version}[/green]")
 
-        # Check and download for each platform
-        downloads = []
-        for platform in platforms:
+        # Bound concurrent requests per product to avoid hammering the CDN
+        sem = asyncio.Semaphore(6)
+
+        # Platforms without a download for this version, and platforms that failed
+        unavailable = []
+        failed = []
+
+        async def _one(platform: Platform):
+            """Resolve, download and unpack a single platform"""
             version_info = VersionInfo(downloader.name, version, platform.os_name, platform.arch)
 
+            # Checked before taking a slot and before any network request
             if version_info.is_downloaded():
-                console.print(f"  ✓ {platform.os_name}-{platform.arch}: [dim]already downloaded[/dim]")
-                continue
+                console.print(f"  ✓ {downloader.name} {platform.os_name}-{platform.arch}: [dim]already downloaded[/dim]")
+                return
+
+            label = f"{downloader.name} {platform.os_name}-{platform.arch}"
+            task_id = None
+
+            async with sem:
+                # Every failure of this platform is caught here: escaping the TaskGroup
+                # would cancel the downloads of the sibling platforms
+                try:
+                    download_url = await downloader.get_download_url(version, platform)
+                    if not download_url:
+                        console.print(f"  ⚠ {label}: [yellow]not available[/yellow]")
+                        unavailable.append(f"{platform.os_name}-{platform.arch}")
+                        return
 
-            download_url = await downloader.get_download_url(version, platform)
-            if not download_url:
-                console.print(f"  ⚠ {platform.os_name}-{platform.arch}: [yellow]not available[/yellow]")
-                continue
-
-            downloads.append((version_info, download_url, platform))
-
-        # Download files with progress tracking
-        if downloads:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                DownloadColumn(),
-                TransferSpeedColumn(),
-                console=console,
-            ) as progress:
-                for version_info, download_url, platform in downloads:
                     # Get filename from URL
                     parsed = urlparse(download_url)
                     filename = Path(parsed.path).name
-                    if not filename or filename == "stable" or filename == "latest":
-                        # Generate filename based on product and platform
-                        ext_map = {
-                            "windows": ".zip",
-                            "linux": ".tar.gz",
-                            "darwin": ".zip",
-                        }
-                        filename = f"{downloader.name}-{platform.os_name}-{platform.arch}{ext_map.get(platform.os_name, '')}"
+                    if filename in ("", "stable", "latest"):
+                        filename = (FILENAME_FALLBACK.get((downloader.name, platform.os_name, platform.arch))
+                                    or fallback_filename(downloader.name, platform))
 
                     dest_path = version_info.get_download_path() / filename
 
                     task_id = progress.add_task(
-                        f"  ↓ {platform.os_name}-{platform.arch}",
+                        f"  ↓ {label}",
                         total=None
                     )
 
-                    try:
-                        await downloader.download_file(download_url, dest_path, progress, task_id)
-
-                        file_size = dest_path.stat().st_size
+                    extract_dir = version_info.get_download_path() / "unpacked"
+                    extract_dir.mkdir(parents=True, exist_ok=True)
 
+                    extractor = None
+                    try:
+                        # Only the transfer takes a global slot; unpacking, including the streamed
+                        # extraction finishing the end of the archive, does not hold one
+                        async with DOWNLOAD_SLOTS:
+                            # TAR.GZ archives are extracted while they download
+                            extractor = StreamExtractor(extract_dir) if filename.endswith((".tar.gz", ".tgz")) else None
+                            result = await downloader.download_file(
+                                download_url, dest_path, progress, task_id, extractor
+                            )
+                    finally:
+                        # Also after a failed transfer: closes the pipe so the extraction thread ends
+                        streamed = extractor is not None and await extractor.finish()
+
+                    if streamed:
+                        console.print(f"    Unpacked TAR.GZ while downloading: {result.path.name}")
+                        unpacked = True
+                    else:
                         # Unpack the downloaded archive
-                        progress.update(task_id, description=f"  ⚙ {platform.os_name}-{platform.arch} (unpacking...)")
+                        progress.update(task_id, description=f"  ⚙ {label} (unpacking...)")
+
+                        # Extraction is blocking, keep it off the event loop and off the threads
+                        # downloads use, so other downloads continue
+                        unpacked = await asyncio.get_running_loop().run_in_executor(
+                            EXTRACT_EXECUTOR, unpack_archive, result.path, extract_dir, tools
+                        )
 
-                        extract_dir = version_info.get_download_path() / "unpacked"
-                        extract_dir.mkdir(exist_ok=True)
+                    # Mark as downloaded and unpacked
+                    version_info.mark_downloaded(download_url, result.size, unpacked, sha256=result.sha256)
 
-                        unpacked = unpack_archive(dest_path, extract_dir, tools)
+                    progress.update(task_id, description=f"  ✓ {label}")
+                except Exception as e:
+                    if task_id is not None:
+                        progress.update(task_id, description=f"  ✗ {label}")
+                    console.print(f"    [red]Error ({label}): {e}[/red]")
+                    failed.append(label)
 
-                        # Mark as downloaded and unpacked
-                        version_info.mark_downloaded(download_url, file_size, unpacked)
+        # Process all platforms concurrently
+        async with asyncio.TaskGroup() as tg:
+            for platform in platforms:
+                tg.create_task(_one(platform))
 
-                        progress.update(task_id, description=f"  ✓ {platform.os_name}-{platform.arch}")
-                    except Exception as e:
-                        progress.update(task_id, description=f"  ✗ {platform.os_name}-{platform.arch}")
-                        console.print(f"    [red]Error: {e}[/red]")
+        # Only a complete run may let the next one skip the remote checks
+        if not failed:
+            latest_check.save(version, unavailable)
 
         console.print(f"[green]✓ {downloader.name} complete[/green]")
 
     except Exception as e:
         console.print(f"[red]✗ Failed to process {downloader.name}: {e}[/red]")
         raise
-    finally:
-        await downloader.close()
+
+
+async def prefetch_versions(downloaders: List[ProductDownloader]) -> Dict[str, Exception]:
+    """
+    Fetch the latest version of all given products at once, before any download starts.
+    Returns the error for each product whose check failed.
+    """
+    results = await asyncio.gather(*(d.get_cached_latest_version() for d in downloaders), return_exceptions=True)
+    return {d.name: result for d, result in zip(downloaders, results) if isinstance(result, Exception)}
 
 
 async def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Download and unpack the latest VS Code forks")
+    parser.add_argument(
+        "--force-check",
+        action="store_true",
+        help="ask upstream for the latest versions even if they were checked recently",
+    )
+    args = parser.parse_args()
+
     console.print("[bold]VSCode Forks Downloader[/bold]")
     console.print("=" * 50)
 
@@ -871,21 +1786,53 @@ async def main():
         console.print("[yellow]  - squashfs-tools (for AppImage extraction)[/yellow]")
         console.print("[yellow]  - p7zip (for Windows installer extraction)[/yellow]")
 
-    # Create downloaders
-    downloaders = [
-        VSCodeDownloader(),
-        VSCodiumDownloader(),
-        CursorDownloader(),
-        WindsurfDownloader(),
-    ]
+    # One HTTP session shared by all downloaders, so connections, TLS sessions
+    # and DNS lookups are reused across products
+    async with aiohttp.ClientSession(
+        # Per-connect/per-read limits: a total timeout would abort large downloads
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT),
+        connector=aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, ttl_dns_cache=300, keepalive_timeout=60),
+    ) as session:
+        # Create downloaders
+        downloaders = [
+            VSCodeDownloader(session),
+            VSCodiumDownloader(session),
+            CursorDownloader(session),
+            WindsurfDownloader(session),
+        ]
+
+        # Decided once per run: a product recently recorded as complete makes no request at all
+        up_to_date = set() if args.force_check else {
+            d.name for d in downloaders if LatestCheck(d.name).is_up_to_date(PLATFORMS)
+        }
+
+        # Check the other products in parallel up front, so being offline or rate-limited
+        # shows before any download starts
+        console.print("\n[bold]Checking latest versions...[/bold]")
+        check_errors = await prefetch_versions([d for d in downloaders if d.name not in up_to_date])
+        for name, error in check_errors.items():
+            console.print(f"[red]✗ Failed to get the latest {name} version: {error}[/red]")
+        downloaders = [d for d in downloaders if d.name not in check_errors]
+
+        # One shared progress display: Rich allows only a single live display at a time
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            console=console,
+        ) as progress:
+            # Download all products concurrently; a failing product does not stop the others
+            results = await asyncio.gather(
+                *(download_product(downloader, PLATFORMS, tools, progress, downloader.name in up_to_date)
+                  for downloader in downloaders),
+                return_exceptions=True,
+            )
 
-    # Download each product
-    for downloader in downloaders:
-        try:
-            await download_product(downloader, PLATFORMS, tools)
-        except Exception as e:
-            console.print(f"[red]Fatal error with {downloader.name}: {e}[/red]")
-            # Continue with other products
+        for downloader, result in zip(downloaders, results):
+            if isinstance(result, Exception):
+                console.print(f"[red]Fatal error with {downloader.name}: {result}[/red]")
 
     console.print("\n[bold green]All downloads complete![/bold green]")
 